@@ -1,8 +1,16 @@
+import io
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
+# Copy-on-Write is always on from pandas 3.0, where the option is deprecated
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 st.set_page_config(
     page_title="Running Analytics", 
     page_icon="🏃", 
@@ -52,6 +60,209 @@ def validate_csv(df):
     
     return errors
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_and_prepare(file_bytes):
+    """Parse, validate and type-convert an uploaded CSV (cached on its bytes)."""
+    try:
+        # Arrow's multi-threaded reader, which also types numeric columns while parsing
+        df = pd.read_csv(io.BytesIO(file_bytes), engine='pyarrow')
+    except (ImportError, ValueError):
+        # Arrow is stricter (e.g. ragged rows); let the C parser handle or report it
+        df = None
+    if df is None or df.columns.duplicated().any():
+        # The C parser also de-duplicates repeated headers ('miles run.1'), which Arrow does not
+        df = pd.read_csv(io.BytesIO(file_bytes))
+    errors = validate_csv(df)
+    if errors:
+        return df, errors
+    
+    # Convert data types (numeric columns usually arrive typed from Arrow, making these cheap)
+    df['date'] = pd.to_datetime(df['date'])
+    df['person'] = df['person'].astype('category')
+    df['miles run'] = pd.to_numeric(df['miles run'], downcast='float')
+    if 'minutes' in df.columns:
+        df['minutes'] = pd.to_numeric(df['minutes'], errors='coerce', downcast='float')
+    return df, errors
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=8,
+    hash_funcs={pd.DataFrame: lambda x: pd.util.hash_pandas_object(x, index=True).sum()},
+)
+def apply_filters_and_derive(df, start_date, end_date, persons, cals_per_mile, est_pace, has_time):
+    """Filter by date range and runners, sort by date, then add pace, calories and period columns."""
+    # Bounds in the column's timezone so tz-aware dates (e.g. ...Z) compare cleanly
+    start_ts = pd.Timestamp(start_date, tz=df['date'].dt.tz)
+    end_ts = pd.Timestamp(end_date, tz=df['date'].dt.tz) + pd.Timedelta(days=1)
+    # Look up each row's category code in a per-category keep table instead of hashing names
+    selected_codes = df['person'].cat.categories.get_indexer(persons)
+    keep = np.zeros(len(df['person'].cat.categories), dtype=bool)
+    keep[selected_codes[selected_codes >= 0]] = True
+    mask = (
+        (df['date'] >= start_ts)
+        & (df['date'] < end_ts)
+        & keep[df['person'].cat.codes.values]
+    )
+    # Sort once by date (stable, so same-day runs keep file order); downstream code relies on it.
+    # With Copy-on-Write the derived columns are added without another defensive copy.
+    return (
+        df.loc[mask]
+        .sort_values('date', kind='mergesort', ignore_index=True)
+        .assign(
+            # Pace and calories calculations
+            # (derived in float64 from the float32 inputs)
+            pace_min_per_mile=lambda d: (
+                d['minutes'].astype('float64') / d['miles run'].astype('float64') if has_time else est_pace
+            ),
+            minutes=lambda d: d['minutes'] if has_time else d['miles run'].astype('float64') * est_pace,
+            calories=lambda d: d['miles run'].astype('float64') * cals_per_mile,
+            # Week / month buckets for the summaries
+            week=lambda d: d['date'].dt.normalize() - pd.to_timedelta(d['date'].dt.weekday, unit='D'),
+            month=lambda d: d['date'].dt.to_period('M').dt.to_timestamp(),
+        )
+    )
+
+@st.cache_resource(show_spinner=False)
+def numba_engine():
+    """Return 'numba' if installed, else None; the first call compiles the float64 groupby kernels used later."""
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return None
+    warmup = pd.DataFrame({
+        'a': pd.Categorical(['x']),
+        'b': np.array([1.0], dtype='float64'),
+    }).groupby('a', observed=True)['b']
+    for kernel in ('sum', 'mean', 'max', 'min', 'std'):
+        getattr(warmup, kernel)(engine='numba')
+    return 'numba'
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def figure_json(chart, _data, data_key, **kwargs):
+    """Build a Plotly Express chart and return its JSON dict (cached on data_key and kwargs)."""
+    return getattr(px, chart)(_data, **kwargs).to_plotly_json()
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def histogram_json(_values, data_key, nbins, **kwargs):
+    """Bin values with NumPy and return a bar-chart JSON dict, so only nbins bars reach the browser."""
+    counts, edges = np.histogram(_values, bins=nbins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = px.bar(x=centers, y=counts, **kwargs)
+    fig.update_traces(width=np.diff(edges))
+    return fig.to_plotly_json()
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    every = (n - 2) / (n_out - 2)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def downsample_by_person(_df, data_key, n_out=1000):
+    """Downsample each runner's date-sorted miles series to at most n_out points with LTTB."""
+    dates = _df['date'].values.astype('int64').astype('float64')
+    miles = _df['miles run'].values.astype('float64')
+    kept = [
+        positions[lttb_indices(dates[positions], miles[positions], n_out)]
+        for positions in _df.groupby('person', observed=True).indices.values()
+    ]
+    # Positions come from the date-sorted frame, so ordering them restores date order without re-sorting rows
+    return _df.take(np.sort(np.concatenate(kept)))
+
+def display_frame(df):
+    """Upcast and round the run columns so float32 noise (e.g. 36.099998) isn't shown or exported."""
+    decimals = {
+        col: n
+        for col, n in {'miles run': 4, 'minutes': 4, 'pace_min_per_mile': 4, 'calories': 2}.items()
+        if col in df.columns
+    }
+    return df.astype(dict.fromkeys(decimals, 'float64')).round(decimals)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_csv_bytes(_df, data_key):
+    """Encode the filtered frame as CSV (cached on data_key so reruns don't re-serialize)."""
+    return display_frame(_df).to_csv(index=False).encode()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_parquet_bytes(_df, data_key):
+    """Encode the filtered frame as zstd-compressed Parquet (cached on data_key)."""
+    buf = io.BytesIO()
+    display_frame(_df).to_parquet(buf, engine='pyarrow', compression='zstd', index=False)
+    return buf.getvalue()
+
+@st.fragment
+def render_person_panel(df, agg_all, df_key, theme_choice):
+    """Per-runner drill-down; runs as a fragment so changing the runner only reruns this panel."""
+    st.subheader("Per-Person Detailed Views")
+    unique_persons = sorted(df['person'].unique())
+    selected_person = st.selectbox("Select a runner to view details:", unique_persons)
+    person_data = df[df['person'] == selected_person]  # inherits the date order of df
+    
+    if len(person_data) > 0:
+        st.markdown(f"### Metrics for {selected_person}")
+        stats = agg_all.loc[selected_person]
+        person_summary = pd.DataFrame({
+            'Metric': ['Total Miles', 'Avg Miles/Run', 'Best Run', 'Shortest Run', 'Calories (est)'],
+            'Value': [
+                f"{stats['total']:.1f}",
+                f"{stats['avg']:.2f}",
+                f"{stats['max']:.2f}",
+                f"{stats['min']:.2f}",
+                f"{stats['calories']:,.0f}",
+            ],
+        })
+        st.dataframe(person_summary, hide_index=True)
+        
+        p_col_chart1, p_col_chart2 = st.columns(2)
+        
+        with p_col_chart1:
+            st.markdown(f"### {selected_person}'s Progress Over Time")
+            fig_person_line = go.Figure(figure_json(
+                'line',
+                person_data,
+                (df_key, 'person_line', selected_person),
+                x='date',
+                y='miles run',
+                markers=True,
+                title="Daily Miles Run",
+                template=theme_choice
+            ))
+            fig_person_line.update_xaxes(title_text="Date")
+            fig_person_line.update_yaxes(title_text="Miles")
+            st.plotly_chart(fig_person_line, use_container_width=True)
+        
+        with p_col_chart2:
+            st.markdown(f"### {selected_person}'s Run Distribution")
+            fig_person_hist = go.Figure(histogram_json(
+                person_data['miles run'].values,
+                (df_key, 'person_hist', selected_person),
+                15,
+                title="Distance Frequency",
+                labels={'x': 'miles run', 'y': 'count'},
+                template=theme_choice
+            ))
+            st.plotly_chart(fig_person_hist, use_container_width=True)
+        
+        st.markdown(f"### {selected_person}'s Run History")
+        history = person_data[['date', 'miles run', 'pace_min_per_mile', 'calories']].tail(500)
+        st.dataframe(display_frame(history.reset_index(drop=True)), use_container_width=True)
+        if len(history) < len(person_data):
+            st.caption(f"Showing the latest 500 of {len(person_data):,} runs.")
+
 # File upload
 uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
 
@@ -65,11 +276,8 @@ with st.sidebar:
 
 if uploaded_file is not None:
     try:
-        # Read the CSV
-        df = pd.read_csv(uploaded_file)
-        
-        # Validate CSV
-        validation_errors = validate_csv(df)
+        # Read, validate and convert the CSV (cached across reruns)
+        df, validation_errors = load_and_prepare(uploaded_file.getvalue())
         
         if validation_errors:
             st.error("**Validation Errors Found:**")
@@ -77,12 +285,9 @@ if uploaded_file is not None:
                 st.error(error)
             st.stop()
         
-        # Convert data types
-        df['date'] = pd.to_datetime(df['date'])
-        df['miles run'] = pd.to_numeric(df['miles run'])
         has_time = 'minutes' in df.columns
-        if has_time:
-            df['minutes'] = pd.to_numeric(df['minutes'], errors='coerce')
+        if len(df) > 50_000:
+            numba_engine()  # compile the numba kernels before the large-frame aggregations
         
         # Sidebar filters
         min_date, max_date = df['date'].min().date(), df['date'].max().date()
@@ -91,69 +296,56 @@ if uploaded_file is not None:
             start_date, end_date = date_range
         else:  # single selection fallback
             start_date, end_date = min_date, date_range
-        persons = sorted(df['person'].unique())
+        persons = list(df['person'].cat.categories)
         selected_persons = st.sidebar.multiselect("Runners", persons, default=persons)
         
-        # Apply filters
-        mask = (
-            (df['date'].dt.date >= start_date)
-            & (df['date'].dt.date <= end_date)
-            & (df['person'].isin(selected_persons))
+        # Apply filters and derive pace/calories (cached on the filter inputs)
+        df = apply_filters_and_derive(
+            df, start_date, end_date, tuple(selected_persons), cals_per_mile, est_pace, has_time
         )
-        df = df.loc[mask].copy()
         if df.empty:
             st.warning("No data after applying filters.")
             st.stop()
-        
-        # Pace and calories calculations
-        if has_time:
-            df['pace_min_per_mile'] = df['minutes'] / df['miles run']
-        else:
-            df['pace_min_per_mile'] = est_pace
-            df['minutes'] = df['miles run'] * est_pace
-        df['calories'] = df['miles run'] * cals_per_mile
+        # Fingerprint of the filtered frame, used to key the cached figures
+        df_key = int(pd.util.hash_pandas_object(df, index=True).sum())
         
         # Display success message
         st.success(f"✅ CSV loaded successfully! ({len(df)} runs, {df['person'].nunique()} runners)")
         
         # Display data preview
         st.subheader("Data Preview (filtered)")
-        st.dataframe(df, use_container_width=True)
+        # Only the first 200 rows are sent to the browser unless the user asks for everything
+        preview = df.drop(columns=['week', 'month'])
+        if len(preview) > 200 and not st.checkbox(f"Show all {len(preview):,} rows"):
+            preview = preview.head(200)
+        st.dataframe(display_frame(preview), use_container_width=True)
         
         # ===== OVERALL METRICS =====
         st.subheader("Overall Summary Metrics")
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
-        
-        with col1:
-            total_miles = df['miles run'].sum()
-            st.metric("Total Miles", f"{total_miles:.1f}")
-        
-        with col2:
-            avg_miles = df['miles run'].mean()
-            st.metric("Avg Miles/Run", f"{avg_miles:.2f}")
-        
-        with col3:
-            max_miles = df['miles run'].max()
-            st.metric("Max Miles", f"{max_miles:.2f}")
-        
-        with col4:
-            min_miles = df['miles run'].min()
-            st.metric("Min Miles", f"{min_miles:.2f}")
-        
-        with col5:
-            num_runs = len(df)
-            st.metric("Total Runs", num_runs)
-        
-        with col6:
-            total_cal = df['calories'].sum()
-            st.metric("Calories (est)", f"{total_cal:,.0f}")
+        # Totals accumulate in float64; float32 sums drift visibly on large uploads
+        miles64 = df['miles run'].astype('float64')
+        miles_stats = miles64.agg(['sum', 'mean', 'max', 'min', 'count'])
+        summary = pd.DataFrame({
+            'Metric': ['Total Miles', 'Avg Miles/Run', 'Max Miles', 'Min Miles', 'Total Runs', 'Runners', 'Calories (est)'],
+            'Value': [
+                f"{miles_stats['sum']:.1f}",
+                f"{miles_stats['mean']:.2f}",
+                f"{miles_stats['max']:.2f}",
+                f"{miles_stats['min']:.2f}",
+                f"{int(miles_stats['count'])}",
+                f"{df['person'].nunique()}",
+                f"{df['calories'].sum():,.0f}",
+            ],
+        })
+        st.dataframe(summary, hide_index=True)
         
         # Weekly goal tracking
         st.subheader("Goal Tracking (weekly)")
         week_end = df['date'].max().normalize()
         week_start = week_end - timedelta(days=6)
-        week_mask = (df['date'] >= week_start) & (df['date'] <= week_end)
-        week_miles = df.loc[week_mask, 'miles run'].sum()
+        # df is date-sorted, so the window is a contiguous slice found by binary search
+        lo, hi = df['date'].searchsorted([week_start, week_end + timedelta(days=1)])
+        week_miles = float(df['miles run'].values[lo:hi].sum(dtype='float64'))
         goal_pct = (week_miles / goal_miles * 100) if goal_miles > 0 else 0
         gcol1, gcol2, gcol3 = st.columns(3)
         gcol1.metric("Weekly miles (last 7 days)", f"{week_miles:.1f}")
@@ -161,6 +353,21 @@ if uploaded_file is not None:
         gcol3.metric("Progress", f"{goal_pct:.0f}%")
         st.progress(min(goal_pct / 100, 1.0))
         
+        # Per-person aggregates (shared by the bar chart and the stats table); large
+        # frames use numba's groupby kernels when it is installed
+        engine = numba_engine() if len(df) > 50_000 else None
+        by_person = df.assign(**{'miles run': miles64}).groupby('person', observed=True)
+        agg_all = by_person.agg(
+            total=('miles run', 'sum'),
+            avg=('miles run', 'mean'),
+            max=('miles run', 'max'),
+            min=('miles run', 'min'),
+            calories=('calories', 'sum'),
+            engine=engine,
+        )
+        agg_all.insert(4, 'runs', by_person.size())  # count has no numba kernel; miles are never null
+        agg_all = agg_all.sort_values('total', ascending=False)
+        
         # ===== VISUALIZATIONS =====
         st.subheader("Overall Visualizations")
         
@@ -168,149 +375,101 @@ if uploaded_file is not None:
         
         with col_viz1:
             st.markdown("### Miles Run Over Time by Person")
-            fig_time = px.line(
-                df.sort_values('date'),
+            # Large uploads are reduced to ~1000 points per runner so the figure stays light
+            if len(df) > 5_000:
+                time_data = downsample_by_person(df, df_key)
+            else:
+                time_data = df
+            fig_time = go.Figure(figure_json(
+                'line',
+                time_data,
+                (df_key, 'time'),
                 x='date',
                 y='miles run',
                 color='person',
                 markers=True,
                 title="Tracking Progress Over Time",
                 template=theme_choice
-            )
+            ))
             fig_time.update_xaxes(title_text="Date")
             fig_time.update_yaxes(title_text="Miles")
             st.plotly_chart(fig_time, use_container_width=True)
+            if len(time_data) < len(df):
+                st.caption(f"Showing {len(time_data):,} of {len(df):,} runs (downsampled per runner).")
         
         with col_viz2:
             st.markdown("### Total Miles by Person")
-            miles_by_person = df.groupby('person')['miles run'].sum().sort_values(ascending=False)
-            fig_bar = px.bar(
-                x=miles_by_person.values,
-                y=miles_by_person.index,
+            miles_by_person = agg_all['total']
+            fig_bar = go.Figure(figure_json(
+                'bar',
+                miles_by_person.reset_index(),
+                (df_key, 'total'),
+                x='total',
+                y='person',
                 orientation='h',
                 title="Cumulative Distance",
-                labels={'x': 'Miles', 'y': 'Person'},
+                labels={'total': 'Miles', 'person': 'Person'},
                 template=theme_choice
-            )
+            ))
             st.plotly_chart(fig_bar, use_container_width=True)
         
         st.markdown("### Distribution of Miles per Run (Overall)")
-        fig_hist = px.histogram(
-            df,
-            x='miles run',
-            nbins=20,
+        fig_hist = go.Figure(histogram_json(
+            df['miles run'].values,
+            (df_key, 'hist'),
+            20,
             title="Frequency Distribution",
-            labels={'miles run': 'Miles'},
+            labels={'x': 'Miles', 'y': 'count'},
             template=theme_choice
-        )
+        ))
         st.plotly_chart(fig_hist, use_container_width=True)
         
         # Weekly / monthly summaries
         st.subheader("Weekly and Monthly Summaries")
-        df['week'] = df['date'].dt.to_period('W').apply(lambda r: r.start_time)
-        df['month'] = df['date'].dt.to_period('M').dt.to_timestamp()
-        weekly = df.groupby('week')['miles run'].agg(['sum', 'mean']).reset_index()
-        monthly = df.groupby('month')['miles run'].agg(['sum', 'mean']).reset_index()
+        weekly = miles64.groupby(df['week']).agg(['sum', 'mean']).reset_index()
+        monthly = miles64.groupby(df['month']).agg(['sum', 'mean']).reset_index()
         wcol, mcol = st.columns(2)
         with wcol:
             st.markdown("### Weekly miles")
-            fig_week = px.bar(weekly, x='week', y='sum', title="Weekly Total Miles", template=theme_choice, labels={'sum': 'Miles'})
+            fig_week = go.Figure(figure_json('bar', weekly, (df_key, 'weekly'), x='week', y='sum', title="Weekly Total Miles", template=theme_choice, labels={'sum': 'Miles'}))
             st.plotly_chart(fig_week, use_container_width=True)
         with mcol:
             st.markdown("### Monthly miles")
-            fig_month = px.bar(monthly, x='month', y='sum', title="Monthly Total Miles", template=theme_choice, labels={'sum': 'Miles'})
+            fig_month = go.Figure(figure_json('bar', monthly, (df_key, 'monthly'), x='month', y='sum', title="Monthly Total Miles", template=theme_choice, labels={'sum': 'Miles'}))
             st.plotly_chart(fig_month, use_container_width=True)
         
         # ===== PER-PERSON STATISTICS =====
         st.subheader("Per-Person Statistics")
-        person_stats = df.groupby('person')['miles run'].agg([
-            ('Total Miles', 'sum'),
-            ('Average Miles', 'mean'),
-            ('Max Miles', 'max'),
-            ('Min Miles', 'min'),
-            ('Run Count', 'count'),
-            ('Calories (est)', 'sum')
-        ]).round(2)
-        person_stats = person_stats.sort_values('Total Miles', ascending=False)
+        person_stats = agg_all.rename(columns={
+            'total': 'Total Miles',
+            'avg': 'Average Miles',
+            'max': 'Max Miles',
+            'min': 'Min Miles',
+            'runs': 'Run Count',
+            'calories': 'Calories (est)'
+        }).round(2)
         st.dataframe(person_stats, use_container_width=True)
         
         # Outlier detection
         st.subheader("Potential Outliers")
-        def detect_outliers(group):
-            mean = group['miles run'].mean()
-            std = group['miles run'].std(ddof=0)
-            upper = mean + 2 * std
-            lower = max(mean - 2 * std, 0)
-            return group[(group['miles run'] > upper) | (group['miles run'] < lower)]
-        outliers = df.groupby('person', group_keys=False).apply(detect_outliers)
+        miles_by_group = by_person['miles run']
+        mean = miles_by_group.transform('mean', engine=engine)
+        std = miles_by_group.transform('std', ddof=0, engine=engine)
+        upper = mean + 2 * std
+        lower = (mean - 2 * std).clip(lower=0)
+        outliers = df.loc[(df['miles run'] > upper) | (df['miles run'] < lower), ['date', 'person', 'miles run']]
         if outliers.empty:
             st.info("No distance outliers detected using ±2σ per person.")
         else:
-            st.dataframe(outliers[['date', 'person', 'miles run']], use_container_width=True)
+            st.dataframe(display_frame(outliers), use_container_width=True)
         
         # ===== PER-PERSON DETAILED VIEWS =====
-        st.subheader("Per-Person Detailed Views")
-        unique_persons = sorted(df['person'].unique())
-        selected_person = st.selectbox("Select a runner to view details:", unique_persons)
-        person_data = df[df['person'] == selected_person].sort_values('date')
-        
-        if len(person_data) > 0:
-            st.markdown(f"### Metrics for {selected_person}")
-            p_col1, p_col2, p_col3, p_col4, p_col5 = st.columns(5)
-            
-            with p_col1:
-                p_total = person_data['miles run'].sum()
-                st.metric(f"{selected_person} - Total Miles", f"{p_total:.1f}")
-            
-            with p_col2:
-                p_avg = person_data['miles run'].mean()
-                st.metric(f"{selected_person} - Avg Miles/Run", f"{p_avg:.2f}")
-            
-            with p_col3:
-                p_max = person_data['miles run'].max()
-                st.metric(f"{selected_person} - Best Run", f"{p_max:.2f}")
-            
-            with p_col4:
-                p_min = person_data['miles run'].min()
-                st.metric(f"{selected_person} - Shortest Run", f"{p_min:.2f}")
-            
-            with p_col5:
-                p_cal = person_data['calories'].sum()
-                st.metric(f"{selected_person} - Calories (est)", f"{p_cal:,.0f}")
-            
-            p_col_chart1, p_col_chart2 = st.columns(2)
-            
-            with p_col_chart1:
-                st.markdown(f"### {selected_person}'s Progress Over Time")
-                fig_person_line = px.line(
-                    person_data,
-                    x='date',
-                    y='miles run',
-                    markers=True,
-                    title="Daily Miles Run",
-                    template=theme_choice
-                )
-                fig_person_line.update_xaxes(title_text="Date")
-                fig_person_line.update_yaxes(title_text="Miles")
-                st.plotly_chart(fig_person_line, use_container_width=True)
-            
-            with p_col_chart2:
-                st.markdown(f"### {selected_person}'s Run Distribution")
-                fig_person_hist = px.histogram(
-                    person_data,
-                    x='miles run',
-                    nbins=15,
-                    title="Distance Frequency",
-                    template=theme_choice
-                )
-                st.plotly_chart(fig_person_hist, use_container_width=True)
-            
-            st.markdown(f"### {selected_person}'s Run History")
-            st.dataframe(person_data[['date', 'miles run', 'pace_min_per_mile', 'calories']].reset_index(drop=True), use_container_width=True)
+        render_person_panel(df, agg_all, df_key, theme_choice)
         
         # Export buttons
         st.subheader("Export")
-        st.download_button("Download filtered data (CSV)", df.to_csv(index=False), file_name="filtered_runs.csv")
+        st.download_button("Download filtered data (CSV)", to_csv_bytes(df, df_key), file_name="filtered_runs.csv")
+        st.download_button("Download filtered data (Parquet)", to_parquet_bytes(df, df_key), file_name="filtered_runs.parquet")
         st.download_button("Download per-person stats (CSV)", person_stats.to_csv(), file_name="person_stats.csv")
 
     except pd.errors.ParserError as e: